@@ -17,6 +17,13 @@ class Settings(BaseSettings):
     debug: bool = False
     database_url: Optional[str] = None
 
+    # Similar-idea recall. Disabled unless both are set
+    embed_model_name: Optional[str] = None
+    recall_dir: Optional[str] = None
+    recall_threshold: float = 0.97  # cosine at or above returns stored result
+    recall_examples: int = 2  # neighbours injected as few-shot below threshold
+    recall_nprobe: int = 3  # k-means lists scored per lookup once trained
+
     model_config = SettingsConfigDict(
         env_file='backend/.env'
     )
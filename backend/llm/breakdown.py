@@ -1,6 +1,6 @@
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableParallel, RunnablePassthrough
+from langchain_core.runnables import RunnableParallel
 
 from backend.llm import base_chat_llm, load_prompts
 from backend.schemas import BreakdownRequest, BreakdownResponse
@@ -16,8 +16,9 @@ prompt = ChatPromptTemplate.from_messages([
 
 chain = (
     RunnableParallel(
-        definition=RunnablePassthrough(),
+        definition=lambda x: x['definition'],
         max_steps=lambda x: x.get('max_steps', 7),
+        examples_block=lambda x: x.get('examples_block', ''),
         format_instructions=lambda _: parser.get_format_instructions()
     )
     | prompt
@@ -26,7 +27,10 @@ chain = (
 )
 
 
-def breakdown_with_lc(req: BreakdownRequest) -> BreakdownResponse:
+def breakdown_with_lc(
+    req: BreakdownRequest, examples_block: str = ''
+) -> BreakdownResponse:
     return chain.invoke({
-        'definition': req.definition, 'max_steps': req.max_steps
+        'definition': req.definition, 'max_steps': req.max_steps,
+        'examples_block': examples_block
     })
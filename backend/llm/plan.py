@@ -1,6 +1,6 @@
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableParallel, RunnablePassthrough
+from langchain_core.runnables import RunnableParallel
 
 from backend.llm import base_chat_llm, load_prompts
 from backend.schemas import PlanRequest, PlanResponse, PlanStep
@@ -22,9 +22,10 @@ def _steps_block(steps: list[PlanStep]) -> str:
 
 chain = (
     RunnableParallel(
-        optionName=RunnablePassthrough(),
+        optionName=lambda x: x['optionName'],
         steps_block=lambda x: _steps_block(x['steps']),
         total_minutes=lambda x: x.get('total_minutes'),
+        examples_block=lambda x: x.get('examples_block', ''),
         format_instructions=lambda _: parser.get_format_instructions()
     )
     | prompt
@@ -33,9 +34,10 @@ chain = (
 )
 
 
-def plan_with_lc(req: PlanRequest) -> PlanResponse:
+def plan_with_lc(req: PlanRequest, examples_block: str = '') -> PlanResponse:
     return chain.invoke({
         'optionName': req.optionName,
         'steps': req.steps,
-        'total_minutes': req.total_minutes
+        'total_minutes': req.total_minutes,
+        'examples_block': examples_block
     })
@@ -1,6 +1,6 @@
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableParallel, RunnablePassthrough
+from langchain_core.runnables import RunnableParallel
 
 from backend.llm import base_chat_llm, load_prompts
 from backend.schemas import RefineRequest, RefineResponse
@@ -27,8 +27,9 @@ prompt = ChatPromptTemplate.from_messages([
 
 chain = (
     RunnableParallel(
-        idea=RunnablePassthrough(),  # Convienent helper to forward value
+        idea=lambda x: x['idea'],
         context_block=lambda x: _context_block(x.get('context')),
+        examples_block=lambda x: x.get('examples_block', ''),
         # Ignore input and use parser instructions
         format_instructions=lambda _: parser.get_format_instructions()
     )
@@ -38,6 +39,9 @@ chain = (
 )
 
 
-def refine_with_lang(req: RefineRequest) -> RefineResponse:
+def refine_with_lang(req: RefineRequest, examples_block: str = '') -> RefineResponse:
     """Invoke the chain and return a validated RefineResponse"""
-    return chain.invoke({'idea': req.idea, 'context': req.context})
+    return chain.invoke({
+        'idea': req.idea, 'context': req.context,
+        'examples_block': examples_block
+    })
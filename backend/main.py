@@ -1,11 +1,12 @@
 # builtin
 import json
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Callable, Optional
 # third
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import HttpUrl
+from pydantic import BaseModel, HttpUrl, ValidationError
 # local
 from backend import (
     ollama_client, settings
@@ -18,6 +19,7 @@ from backend.schemas import (
 from backend.llm.refine import refine_with_lang, chain as refine_chain
 from backend.llm.breakdown import breakdown_with_lc, chain as breakdown_chain
 from backend.llm.plan import plan_with_lc, chain as plan_chain
+from backend.recall import Recall, Recollection
 
 
 app = FastAPI(title="task-orchestrator-backend", version="0.1.0")
@@ -29,6 +31,55 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+refine_recall = Recall('refine', RefineResponse)
+breakdown_recall = Recall('breakdown', BreakdownResponse)
+plan_recall = Recall('plan', PlanResponse)
+
+
+def _refine_text(request: RefineRequest) -> str:
+    return f'{request.idea}\n{request.context or ""}'.strip()
+
+
+def _breakdown_fields(request: BreakdownRequest) -> dict:
+    return {'max_steps': request.max_steps}
+
+
+def _plan_text(request: PlanRequest) -> str:
+    steps = '\n'.join(f'{i+1}. {s.text}' for i, s in enumerate(request.steps))
+    return f'{request.optionName}\n{steps}'
+
+
+def _plan_fields(request: PlanRequest) -> dict:
+    """Must match exactly for a recalled plan to be reused"""
+    return {
+        'optionName': request.optionName,
+        'steps': [s.text for s in request.steps],
+        'total_minutes': request.total_minutes
+    }
+
+
+def _finalize_breakdown(
+    out: BreakdownResponse, max_steps: Optional[int]
+) -> BreakdownResponse:
+    for p in out.plans:
+        p.name = (p.name or '').strip() or 'Plan'
+        p.steps = [
+            s for s in p.steps if s.text.strip()][: min(
+                len(p.steps), max_steps or 7)
+        ]
+    return out
+
+
+def _finalize_plan(out: PlanResponse) -> PlanResponse:
+    # until tool calling is implemented force 15 min multiples old fashioned way
+    for s in out.steps:
+        q = int(round(s.duration_minutes / 15.0)) * 15
+        s.duration_minutes = 15 if q < 15 else q
+
+    out.parked_indices = [i + 1 for i, s in enumerate(out.steps) if s.parked]
+    out.total_duration = sum(s.duration_minutes for s in out.steps if not s.parked)
+    return out
+
 
 def _sse_format(type_, data_):
     result = f"data: {json.dumps({'type': type_, 'data': data_})}\n\n"
@@ -36,10 +87,21 @@ def _sse_format(type_, data_):
     return result
 
 
-async def event_stream(chain, payload) -> AsyncGenerator[str, None]:
+async def event_stream(
+    chain, payload,
+    recollection: Optional[Recollection] = None,
+    finalize: Optional[Callable[[dict], BaseModel]] = None
+) -> AsyncGenerator[str, None]:
     """
-    Create compat func for langchain events to SSE streamable
+    Create compat func for langchain events to SSE streamable.
+    A recalled hit is replayed as a single done event without the LLM.
+    finalize validates and post-processes the same way the plain endpoint
+    does, so the streamed and stored result match what it would return
     """
+    if recollection is not None and recollection.hit is not None:
+        yield _sse_format('done', recollection.hit.model_dump())
+        return
+
     buffer = ''
     try:
         async for event in chain.astream_events(payload):
@@ -52,7 +114,17 @@ async def event_stream(chain, payload) -> AsyncGenerator[str, None]:
 
         try:
             clean = buffer.replace('```json', '').replace('```', '').strip()
-            yield _sse_format('done', json.loads(clean))
+            result = json.loads(clean)
+            if finalize is not None:
+                try:
+                    out = finalize(result)
+                    # store before done. Clients may disconnect once they have it
+                    if recollection is not None:
+                        await run_in_threadpool(recollection.remember, out)
+                    result = out.model_dump()
+                except ValidationError:
+                    pass  # stream the raw JSON and keep it out of recall
+            yield _sse_format('done', result)
         except json.JSONDecodeError:
             yield _sse_format('type', buffer)
     except Exception as catchall_e:
@@ -62,26 +134,44 @@ async def event_stream(chain, payload) -> AsyncGenerator[str, None]:
 @app.post('/stream/refine')
 async def stream_refine(request: RefineRequest):
     """Streaming refine using existing LangChain setup"""
-    payload = {'idea': request.idea, 'context': request.context}
-    return StreamingResponse(event_stream(refine_chain, payload))
+    recollection = await run_in_threadpool(
+        refine_recall.lookup, _refine_text(request)
+    )
+    payload = {
+        'idea': request.idea, 'context': request.context,
+        'examples_block': recollection.examples_block
+    }
+    return StreamingResponse(event_stream(
+        refine_chain, payload, recollection, RefineResponse.model_validate
+    ))
 
 
 @app.post('/stream/breakdown')
 async def stream_breakdown(request: BreakdownRequest):
     """Stream breakdown with existing lang setup"""
+    recollection = await run_in_threadpool(
+        breakdown_recall.lookup, request.definition, _breakdown_fields(request)
+    )
     return StreamingResponse(event_stream(breakdown_chain, {
-        'definition': request.definition, 'max_steps': request.max_steps
-    }))
+        'definition': request.definition, 'max_steps': request.max_steps,
+        'examples_block': recollection.examples_block
+    }, recollection, lambda r: _finalize_breakdown(
+        BreakdownResponse.model_validate(r), request.max_steps
+    )))
 
 
 @app.post('/stream/plan')
 async def stream_plan(request: PlanRequest):
     """Stream plan with existing lang setup"""
+    recollection = await run_in_threadpool(
+        plan_recall.lookup, _plan_text(request), _plan_fields(request)
+    )
     return StreamingResponse(event_stream(plan_chain, {
         'optionName': request.optionName,
         'steps': request.steps,
-        'total_minutes': request.total_minutes
-    }))
+        'total_minutes': request.total_minutes,
+        'examples_block': recollection.examples_block
+    }, recollection, lambda r: _finalize_plan(PlanResponse.model_validate(r))))
 
 
 @app.get("/health", response_model=Health)
@@ -117,7 +207,12 @@ def refine(request: RefineRequest):
         raise HTTPException(status_code=500, detail="ollama client unavailable")
 
     try:
-        out = refine_with_lang(request)
+        recollection = refine_recall.lookup(_refine_text(request))
+        if recollection.hit is not None:
+            return recollection.hit
+
+        out = refine_with_lang(request, recollection.examples_block)
+        recollection.remember(out)
         return out
     except Exception as gen_exception:
         raise HTTPException(502, detail=f'refine failed with\n{gen_exception}')
@@ -126,14 +221,15 @@ def refine(request: RefineRequest):
 @app.post('/breakdown', response_model=BreakdownResponse)
 def breakdown(req: BreakdownRequest):
     try:
-        out = breakdown_with_lc(req)
-        for p in out.plans:
-            p.name = (p.name or '').strip() or 'Plan'
-            p.steps = [
-                s for s in p.steps if s.text.strip()][: min(
-                    len(p.steps), req.max_steps or 7)
-            ]
-            return out
+        recollection = breakdown_recall.lookup(req.definition, _breakdown_fields(req))
+        if recollection.hit is not None:
+            return recollection.hit
+
+        out = _finalize_breakdown(
+            breakdown_with_lc(req, recollection.examples_block), req.max_steps
+        )
+        recollection.remember(out)
+        return out
     except Exception as general_exception:
         raise HTTPException(
             status_code=502, detail=f'breakdown failed with\n{general_exception}'
@@ -143,14 +239,12 @@ def breakdown(req: BreakdownRequest):
 @app.post('/plan', response_model=PlanResponse)
 def plan(req: PlanRequest):
     try:
-        out = plan_with_lc(req)
-        # until tool calling is implemented force 15 min multiples old fashioned way
-        for s in out.steps:
-            q = int(round(s.duration_minutes / 15.0)) * 15
-            s.duration_minutes = 15 if q < 15 else q
-
-        out.parked_indices = [i + 1 for i, s in enumerate(out.steps) if s.parked]
-        out.total_duration = sum(s.duration_minutes for s in out.steps if not s.parked)
+        recollection = plan_recall.lookup(_plan_text(req), _plan_fields(req))
+        if recollection.hit is not None:
+            return recollection.hit
+
+        out = _finalize_plan(plan_with_lc(req, recollection.examples_block))
+        recollection.remember(out)
         return out
     except Exception as general_exception:
         raise HTTPException(
@@ -0,0 +1,408 @@
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from pydantic import BaseModel, ValidationError
+
+from backend import ollama_client, settings
+
+
+# Hits need matching fields too, so look past the single nearest row
+_HIT_CANDIDATES = 8
+
+
+def _replace(path: Path, data: bytes):
+    """Atomic rewrite so a crash leaves the old file or the new one"""
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class VectorIndex:
+    """
+    Append-only cosine index. Unit vectors live in a memory-mapped float32
+    matrix (vectors.f32) and payloads in entries.jsonl, one line per row.
+    Below train_size rows every lookup is an exact scan. Past it the rows
+    are clustered into nlist k-means lists and a lookup only scores the
+    nprobe lists nearest the query. The lists are retrained whenever the
+    index has grown retrain_factor times since they were last trained.
+    Each training writes centroids-<n>.f32 and lists-<n>.i32 for a new
+    generation n, and meta.json names the current one
+    """
+
+    def __init__(
+        self, directory: Path,
+        nlist: int = 1024, nprobe: int = 3,
+        train_size: int = 32768, retrain_factor: int = 4
+    ):
+        directory.mkdir(parents=True, exist_ok=True)
+        self._directory = directory
+        self._vectors_path = directory / 'vectors.f32'
+        self._entries_path = directory / 'entries.jsonl'
+        self._meta_path = directory / 'meta.json'
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.retrain_factor = retrain_factor
+        self._generation = 0  # 0 until the first training
+        self._trained_rows = 0
+        self._lock = threading.Lock()
+        self._offsets: list[int] = []
+        self._matrix: Optional[np.memmap] = None
+        self._dim = 0
+        self._capacity = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: list[list[int]] = []
+        self._training = False
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def _centroids_path(self, generation: int) -> Path:
+        return self._directory / f'centroids-{generation}.f32'
+
+    def _lists_path(self, generation: int) -> Path:
+        return self._directory / f'lists-{generation}.i32'
+
+    def _write_meta(self):
+        _replace(self._meta_path, json.dumps({
+            'dim': self._dim,
+            'generation': self._generation,
+            'trained_rows': self._trained_rows
+        }).encode())
+
+    def _load(self):
+        if self._meta_path.exists() and self._vectors_path.exists():
+            with open(self._meta_path, 'r') as f:
+                meta = json.load(f)
+            self._dim = meta['dim']
+            self._generation = meta.get('generation', 0)
+            self._trained_rows = meta.get('trained_rows', 0)
+            self._map(os.path.getsize(self._vectors_path) // (self._dim * 4))
+
+        if not self._entries_path.exists():
+            return
+        offset = 0
+        with open(self._entries_path, 'rb') as f:
+            for line in f:
+                # torn write from a crash mid-append, or an entry whose
+                # vector never made it. Vectors are written first
+                if not line.endswith(b'\n') or len(self._offsets) >= self._capacity:
+                    break
+                self._offsets.append(offset)
+                offset += len(line)
+        # drop the tail so the next append starts on a clean line
+        if offset != os.path.getsize(self._entries_path):
+            os.truncate(self._entries_path, offset)
+
+        n = len(self._offsets)
+        if n and self._generation:
+            centroids = np.fromfile(
+                self._centroids_path(self._generation), dtype=np.float32
+            ).reshape(-1, self._dim)
+            lists_path = self._lists_path(self._generation)
+            assigned = np.fromfile(lists_path, dtype=np.int32) \
+                if lists_path.exists() else np.empty(0, dtype=np.int32)
+            if len(assigned) != n:
+                # list ids are written between vector and entry, so a crash
+                # can leave one extra or a few missing
+                assigned = np.concatenate([
+                    assigned[:n],
+                    self._assign(centroids, self._matrix, len(assigned[:n]), n)
+                ])
+                _replace(lists_path, assigned.tobytes())
+            self._install(centroids, assigned)
+
+    def _map(self, capacity: int):
+        self._capacity = capacity
+        # read-only map. Rows are written with plain file writes in add
+        self._matrix = np.memmap(
+            self._vectors_path, dtype=np.float32, mode='r',
+            shape=(capacity, self._dim)
+        ) if capacity else None
+
+    def _grow(self):
+        """Double the backing file. Old maps stay valid for readers"""
+        capacity = max(1024, self._capacity * 2)
+        with open(self._vectors_path, 'ab'):
+            pass
+        os.truncate(self._vectors_path, capacity * self._dim * 4)
+        if not self._meta_path.exists():
+            # only once vectors.f32 exists, so _load never sees meta alone
+            self._write_meta()
+        self._map(capacity)
+
+    @staticmethod
+    def _assign(
+        centroids: np.ndarray, matrix: np.ndarray, start: int, stop: int
+    ) -> np.ndarray:
+        """Nearest list id for rows start to stop, in chunks to bound memory"""
+        chunks = [
+            np.argmax(matrix[i:min(i + 65536, stop)] @ centroids.T, axis=1)
+            for i in range(start, stop, 65536)
+        ]
+        return np.concatenate(chunks).astype(np.int32) \
+            if chunks else np.empty(0, dtype=np.int32)
+
+    def _install(self, centroids: np.ndarray, assigned: np.ndarray):
+        order = np.argsort(assigned, kind='stable')
+        bounds = np.searchsorted(assigned[order], np.arange(len(centroids) + 1))
+        self._lists = [
+            order[bounds[j]:bounds[j + 1]].tolist() for j in range(len(centroids))
+        ]
+        self._centroids = centroids
+
+    def train(self):
+        """
+        Cluster the rows into k-means lists. Adds may continue meanwhile.
+        Runs on its own at train_size rows, then each time the index has
+        grown retrain_factor times
+        """
+        with self._lock:
+            matrix, n = self._matrix, len(self._offsets)
+        nlist = min(self.nlist, n)
+        if not nlist:
+            return
+
+        # spherical k-means on a sample. Enough to place the centroids
+        rng = np.random.default_rng(0)
+        sample = matrix[np.sort(rng.choice(n, min(n, 32 * nlist), replace=False))]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+        for _ in range(8):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # an empty list keeps its previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        assigned = self._assign(centroids, matrix, 0, n)
+
+        with self._lock:
+            # rows added while clustering
+            assigned = np.concatenate([
+                assigned,
+                self._assign(centroids, self._matrix, n, len(self._offsets))
+            ])
+            previous, generation = self._generation, self._generation + 1
+            _replace(self._lists_path(generation), assigned.tobytes())
+            _replace(
+                self._centroids_path(generation),
+                centroids.astype(np.float32).tobytes()
+            )
+            # meta is the commit point. A crash before it keeps the old pair
+            self._generation, self._trained_rows = generation, len(assigned)
+            self._write_meta()
+            self._install(centroids, assigned)
+            if previous:
+                self._lists_path(previous).unlink(missing_ok=True)
+                self._centroids_path(previous).unlink(missing_ok=True)
+
+    def _train_in_background(self):
+        try:
+            self.train()
+        except Exception as train_error:
+            print(f'Warning: recall index training failed\n{train_error}')
+        finally:
+            self._training = False
+
+    def add(self, vector: np.ndarray, payload: dict):
+        with self._lock:
+            if not self._dim:
+                self._dim = vector.shape[0]
+            if vector.shape[0] != self._dim:
+                raise ValueError(
+                    f'embedding has {vector.shape[0]} dims, index has {self._dim}'
+                )
+            n = len(self._offsets)
+            if n >= self._capacity:
+                self._grow()
+            # write just this row instead of flushing the whole map
+            with open(self._vectors_path, 'r+b') as f:
+                f.seek(n * self._dim * 4)
+                f.write(vector.astype(np.float32).tobytes())
+
+            if self._centroids is not None:
+                nearest = int(np.argmax(self._centroids @ vector))
+                with open(self._lists_path(self._generation), 'ab') as f:
+                    f.write(np.int32(nearest).tobytes())
+                self._lists[nearest].append(n)
+
+            line = (json.dumps(payload) + '\n').encode()
+            with open(self._entries_path, 'ab') as f:
+                offset = f.tell()
+                f.write(line)
+            self._offsets.append(offset)
+
+            if not self._training and len(self._offsets) >= max(
+                self.train_size, self.retrain_factor * self._trained_rows
+            ):
+                self._training = True
+                threading.Thread(target=self._train_in_background, daemon=True).start()
+
+    def top_k(self, vector: np.ndarray, k: int) -> list[tuple[float, dict]]:
+        """Highest cosine matches first. vector must be unit length"""
+        # Under the lock so a concurrent add or grow cannot shift the rows
+        with self._lock:
+            matrix, n = self._matrix, len(self._offsets)
+            if matrix is None or n == 0 or k <= 0:
+                return []
+            if vector.shape[0] != self._dim:
+                raise ValueError(
+                    f'embedding has {vector.shape[0]} dims, index has {self._dim}'
+                )
+
+            if self._centroids is None:
+                rows = None
+                scores = matrix[:n] @ vector
+            else:
+                nprobe = min(self.nprobe, len(self._centroids))
+                near = np.argpartition(self._centroids @ vector, -nprobe)[-nprobe:]
+                # sorted rows read the map front to back
+                rows = np.sort(np.concatenate([
+                    np.array(self._lists[j], dtype=np.int64) for j in near
+                ]))
+                scores = matrix[rows] @ vector
+
+            m = len(scores)
+            k = min(k, m)
+            if not k:
+                return []
+            top = np.argpartition(scores, m - k)[m - k:]
+            top = top[np.argsort(scores[top])[::-1]]
+            ids = top if rows is None else rows[top]
+            return [(float(scores[i]), self._entry(j)) for i, j in zip(top, ids)]
+
+    def _entry(self, i: int) -> dict:
+        with open(self._entries_path, 'rb') as f:
+            f.seek(self._offsets[i])
+            return json.loads(f.readline())
+
+
+def embed(text: str) -> np.ndarray:
+    """Unit-length embedding from the local Ollama endpoint"""
+    r = ollama_client.embed(model=settings.embed_model_name or '', input=text)
+    vector = np.asarray(r['embeddings'][0], dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+class Recollection:
+    """Outcome of a lookup. Either a stored hit or neighbours to learn from"""
+
+    def __init__(
+        self,
+        recall: Optional['Recall'] = None,
+        text: str = '',
+        fields: Optional[dict] = None,
+        vector: Optional[np.ndarray] = None,
+        hit: Optional[BaseModel] = None,
+        neighbours: Optional[list[dict]] = None
+    ):
+        self.recall = recall
+        self.text = text
+        self.fields = fields
+        self.vector = vector
+        self.hit = hit
+        self.neighbours = neighbours or []
+
+    @property
+    def examples_block(self) -> str:
+        """Few-shot block for the prompt. Empty when there is nothing similar"""
+        if not self.neighbours:
+            return ''
+        examples = '\n\n'.join(
+            f"Input:\n{n['input']}\n"
+            + (f"Fields: {json.dumps(n['fields'])}\n" if n.get('fields') else '')
+            + f"Output:\n{json.dumps(n['output'])}"
+            for n in self.neighbours
+        )
+        return (
+            'Similar past requests and accepted outputs.'
+            f' Reuse what fits:\n\n{examples}\n\n'
+        )
+
+    def remember(self, result: BaseModel | dict):
+        """Store the generated result so near-duplicates can reuse it"""
+        if self.recall is None or self.vector is None:
+            return
+        self.recall.remember(self, result)
+
+
+class Recall:
+    """
+    Similar-idea retrieval for one endpoint. Cosine similarity only judges the
+    free text. A stored result is returned as is when it scores at least
+    recall_threshold and its structured fields (step lists, budgets, limits)
+    are equal. Otherwise the nearest results become few-shot examples.
+    A no-op unless embed_model_name and recall_dir are configured
+    """
+
+    def __init__(self, name: str, response_model: type[BaseModel]):
+        self.name = name
+        self.response_model = response_model
+        self._index: Optional[VectorIndex] = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(
+            ollama_client is not None
+            and settings.embed_model_name and settings.recall_dir
+        )
+
+    @property
+    def index(self) -> VectorIndex:
+        # lazy so nothing touches disk when recall is disabled
+        with self._index_lock:
+            if self._index is None:
+                # one index per embedding model. Dimensions and geometry differ
+                model = re.sub(r'[^\w.-]', '_', settings.embed_model_name or '')
+                self._index = VectorIndex(
+                    Path(settings.recall_dir) / model / self.name,
+                    nprobe=settings.recall_nprobe
+                )
+            return self._index
+
+    def lookup(self, text: str, fields: Optional[dict] = None) -> Recollection:
+        """fields must be JSON plain (lists not tuples) to compare equal"""
+        if not self.enabled:
+            return Recollection()
+
+        try:
+            vector = embed(text)
+            matches = self.index.top_k(
+                vector, max(_HIT_CANDIDATES, settings.recall_examples)
+            )
+        except Exception as recall_error:
+            print(f'Warning: {self.name} recall lookup failed\n{recall_error}')
+            return Recollection()
+
+        for score, entry in matches:
+            if score < settings.recall_threshold:
+                break
+            if entry.get('fields') != fields:
+                continue
+            try:
+                hit = self.response_model.model_validate(entry['output'])
+                return Recollection(self, text, fields, vector, hit=hit)
+            except ValidationError:
+                pass  # schema moved on since it was stored. Regenerate
+
+        neighbours = [entry for _, entry in matches[:settings.recall_examples]]
+        return Recollection(self, text, fields, vector, neighbours=neighbours)
+
+    def remember(self, recollection: Recollection, result: BaseModel | dict):
+        try:
+            output = self.response_model.model_validate(result).model_dump()
+            self.index.add(recollection.vector, {
+                'input': recollection.text,
+                'fields': recollection.fields,
+                'output': output
+            })
+        except Exception as recall_error:
+            print(f'Warning: {self.name} recall store failed\n{recall_error}')
@@ -0,0 +1,124 @@
+"""
+Lookup latency of the recall VectorIndex at scale.
+
+Builds an index of clustered synthetic unit vectors (real embeddings cluster
+by topic, uniform noise would not) the way a growing service would. Rows up
+to the last retraining point are written directly and clustered. The rest go
+through add() and join their nearest existing list. Then top_k is timed for
+noisy copies of stored rows, and Recall@1 is checked against an exact scan.
+From the repo root:
+
+    poetry run python -m benchmarks.recall_lookup --rows 1000000 --dim 768
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.recall import VectorIndex
+
+
+def chunks(rows: int, dim: int, rng: np.random.Generator):
+    topics = rng.standard_normal((max(1, rows // 250), dim), dtype=np.float32)
+    for start in range(0, rows, 65536):
+        chunk = topics[rng.integers(0, len(topics), min(65536, rows - start))]
+        chunk += 0.7 * rng.standard_normal(chunk.shape, dtype=np.float32)
+        yield chunk / np.linalg.norm(chunk, axis=1, keepdims=True)
+
+
+def last_training(rows: int, index: VectorIndex) -> int:
+    """Row count the lists were last trained at once the index holds rows"""
+    trained = index.train_size
+    while trained * index.retrain_factor <= rows:
+        trained *= index.retrain_factor
+    return min(trained, rows)
+
+
+def build(directory: Path, rows: int, dim: int, nprobe: int) -> VectorIndex:
+    """
+    Write the rows before the last training directly, since add() per row
+    would take a long time, then add the rest like the service does
+    """
+    trained = last_training(rows, VectorIndex(directory))
+    vectors = np.memmap(
+        directory / 'vectors.f32', dtype=np.float32, mode='w+', shape=(trained, dim)
+    )
+    written = 0
+    stream = chunks(rows, dim, np.random.default_rng(0))
+    remainder = []
+    for chunk in stream:
+        take = min(len(chunk), trained - written)
+        vectors[written:written + take] = chunk[:take]
+        written += take
+        if take < len(chunk):
+            remainder.append(chunk[take:])
+            break
+    vectors.flush()
+    del vectors
+
+    with open(directory / 'entries.jsonl', 'w') as f:
+        for i in range(trained):
+            f.write(json.dumps({'input': str(i), 'fields': None, 'output': {}}) + '\n')
+    with open(directory / 'meta.json', 'w') as f:
+        json.dump({'dim': dim}, f)
+
+    index = VectorIndex(directory, nprobe=nprobe)
+    if trained >= index.train_size:
+        started = time.perf_counter()
+        index.train()
+        print(f'train at {trained} rows: {time.perf_counter() - started:.1f} s')
+
+    started = time.perf_counter()
+    i = trained
+    for chunk in [*remainder, *stream]:
+        for row in chunk:
+            index.add(row, {'input': str(i), 'fields': None, 'output': {}})
+            i += 1
+    print(f'add {rows - trained} rows: {time.perf_counter() - started:.1f} s')
+    return index
+
+
+def percentiles(seconds: list[float]) -> str:
+    ms = np.asarray(seconds) * 1000
+    return f'median {np.median(ms):.2f} ms  p95 {np.percentile(ms, 95):.2f} ms'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--nprobe', type=int, default=3)
+    parser.add_argument('--k', type=int, default=8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        started = time.perf_counter()
+        index = build(directory, args.rows, args.dim, args.nprobe)
+        print(f'build {args.rows} x {args.dim}: {time.perf_counter() - started:.1f} s')
+
+        matrix = np.memmap(
+            directory / 'vectors.f32', dtype=np.float32, mode='r',
+            shape=(args.rows, args.dim)
+        )
+        timings, hits = [], 0
+        for row in rng.integers(0, args.rows, args.queries):
+            query = matrix[row] + 0.05 * rng.standard_normal(args.dim, dtype=np.float32)
+            query /= np.linalg.norm(query)
+            started = time.perf_counter()
+            matches = index.top_k(query, args.k)
+            timings.append(time.perf_counter() - started)
+            exact = int(np.argmax(matrix @ query))
+            hits += matches[0][1]['input'] == str(exact)
+
+        print(f'top_k (nprobe {args.nprobe}, k {args.k}): {percentiles(timings)}')
+        print(f'recall@1 vs exact scan: {hits / args.queries:.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+import asyncio
+import hashlib
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from backend import main, recall
+from backend.llm import breakdown
+from backend.recall import Recall
+from backend.schemas import (
+    BreakdownRequest, BreakdownResponse, PlanRequest, PlanResponse,
+    RefineRequest, RefineResponse
+)
+
+
+def _embed(text: str) -> np.ndarray:
+    """Stable per text. Different texts land far below the hit threshold"""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], 'big')
+    vector = np.random.default_rng(seed).standard_normal(64).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(recall, 'ollama_client', object())
+    monkeypatch.setattr(recall, 'embed', _embed)
+    monkeypatch.setattr(recall.settings, 'embed_model_name', 'test-embed')
+    monkeypatch.setattr(recall.settings, 'recall_dir', str(tmp_path))
+    monkeypatch.setattr(recall.settings, 'recall_threshold', 0.97)
+    for endpoint_recall in (main.refine_recall, main.breakdown_recall, main.plan_recall):
+        monkeypatch.setattr(endpoint_recall, '_index', None)
+    return TestClient(main.app)
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError('the LLM should not be called on a recall hit')
+
+
+class _FailingChain:
+    def astream_events(self, payload):
+        _fail()
+
+
+class _StreamingChain:
+    """Streams one canned chunk the way ChatOllama events arrive"""
+
+    def __init__(self, output: dict):
+        self.output = output
+
+    async def astream_events(self, payload):
+        class Chunk:
+            content = json.dumps(self.output)
+        yield {'event': 'on_chat_model_stream', 'data': {'chunk': Chunk()}}
+
+
+def _steps(*texts: str) -> list[dict]:
+    return [{'text': t} for t in texts]
+
+
+REFINE_BODY = {'idea': 'Plan my career path', 'context': None}
+REFINE_STORED = RefineResponse(
+    refinedIdea='Six month path toward AI platform roles', questions=[]
+)
+
+BREAKDOWN_BODY = {'definition': 'Ship the talk outline', 'max_steps': 3}
+BREAKDOWN_STORED = BreakdownResponse(plans=[
+    {'name': 'Lean Plan', 'steps': _steps('Draft', 'Review', 'Ship')},
+    {'name': 'Thorough Plan', 'steps': _steps('Research', 'Draft', 'Ship')},
+])
+
+PLAN_BODY = {
+    'optionName': 'Lean Plan',
+    'steps': _steps('Draft', 'Review', 'Ship'),
+    'total_minutes': 120
+}
+PLAN_STORED = PlanResponse(
+    optionName='Lean Plan',
+    steps=[
+        {'text': 'Draft', 'duration_minutes': 30},
+        {'text': 'Review', 'duration_minutes': 15},
+        {'text': 'Ship', 'duration_minutes': 15},
+    ],
+    total_duration=60
+)
+
+
+def _store_refine():
+    request = RefineRequest(**REFINE_BODY)
+    main.refine_recall.lookup(main._refine_text(request)).remember(REFINE_STORED)
+
+
+def _store_breakdown():
+    request = BreakdownRequest(**BREAKDOWN_BODY)
+    main.breakdown_recall.lookup(
+        request.definition, main._breakdown_fields(request)
+    ).remember(BREAKDOWN_STORED)
+
+
+def _store_plan():
+    request = PlanRequest(**PLAN_BODY)
+    main.plan_recall.lookup(
+        main._plan_text(request), main._plan_fields(request)
+    ).remember(PLAN_STORED)
+
+
+HITS = [
+    ('refine', 'refine_with_lang', 'refine_chain', REFINE_BODY, REFINE_STORED, _store_refine),
+    (
+        'breakdown', 'breakdown_with_lc', 'breakdown_chain',
+        BREAKDOWN_BODY, BREAKDOWN_STORED, _store_breakdown
+    ),
+    ('plan', 'plan_with_lc', 'plan_chain', PLAN_BODY, PLAN_STORED, _store_plan),
+]
+
+
+@pytest.mark.parametrize('path, llm, chain, body, stored, store', HITS)
+def test_hit_returns_stored_result_without_llm(
+    client, monkeypatch, path, llm, chain, body, stored, store
+):
+    store()
+    monkeypatch.setattr(main, llm, _fail)
+
+    response = client.post(f'/{path}', json=body)
+    assert response.status_code == 200
+    assert response.json() == stored.model_dump()
+
+
+@pytest.mark.parametrize('path, llm, chain, body, stored, store', HITS)
+def test_stream_replays_hit_as_single_done_event(
+    client, monkeypatch, path, llm, chain, body, stored, store
+):
+    store()
+    monkeypatch.setattr(main, chain, _FailingChain())
+
+    response = client.post(f'/stream/{path}', json=body)
+    events = [
+        json.loads(line[len('data: '):])
+        for line in response.text.splitlines() if line.startswith('data: ')
+    ]
+    assert events == [{'type': 'done', 'data': stored.model_dump()}]
+
+
+def _drain_stream(chain, finalize, stored: list) -> list[dict]:
+    """Run event_stream and note how many results were stored before done"""
+    recollection = recall.Recollection(
+        Recall('stream', PlanResponse), 'text', None, _embed('text')
+    )
+    recollection.remember = stored.append
+
+    async def run():
+        events = []
+        async for line in main.event_stream(chain, {}, recollection, finalize):
+            event = json.loads(line[len('data: '):])
+            if event['type'] == 'done':
+                event['stored_before'] = len(stored)
+            events.append(event)
+        return events
+
+    return asyncio.run(run())
+
+
+def test_streamed_plan_is_finalized_before_it_is_stored():
+    raw = {
+        'optionName': 'Lean Plan',
+        'steps': [
+            {'text': 'Draft', 'duration_minutes': 20},
+            {'text': 'Review', 'duration_minutes': 5, 'parked': True},
+        ],
+        'total_duration': 1
+    }
+    stored = []
+    events = _drain_stream(
+        _StreamingChain(raw),
+        lambda r: main._finalize_plan(PlanResponse.model_validate(r)),
+        stored
+    )
+
+    done = events[-1]
+    assert done['stored_before'] == 1
+    assert [s.duration_minutes for s in stored[0].steps] == [15, 15]
+    assert stored[0].total_duration == 15
+    assert stored[0].parked_indices == [2]
+    assert done['data'] == stored[0].model_dump()
+
+
+def test_streamed_breakdown_is_trimmed_before_it_is_stored():
+    raw = {'plans': [
+        {'name': ' Lean Plan ', 'steps': _steps('A step', 'B step', 'C step', 'D step')},
+        {'name': '', 'steps': _steps('E step', 'F step', 'G step')},
+    ]}
+    stored = []
+    events = _drain_stream(
+        _StreamingChain(raw),
+        lambda r: main._finalize_breakdown(BreakdownResponse.model_validate(r), 3),
+        stored
+    )
+
+    assert events[-1]['stored_before'] == 1
+    assert [len(p.steps) for p in stored[0].plans] == [3, 3]
+    assert [p.name for p in stored[0].plans] == ['Lean Plan', 'Plan']
+
+
+def test_below_threshold_sends_few_shot_block_to_model(client, monkeypatch):
+    _store_breakdown()
+    prompts = []
+
+    def model(prompt_value):
+        prompts.append(prompt_value.to_string())
+        return AIMessage(content=BREAKDOWN_STORED.model_dump_json())
+
+    monkeypatch.setattr(breakdown, 'chain', (
+        breakdown.chain.first | breakdown.prompt
+        | RunnableLambda(model) | breakdown.parser
+    ))
+
+    response = client.post(
+        '/breakdown', json={'definition': 'Write a conference talk', 'max_steps': 3}
+    )
+    assert response.status_code == 200
+    assert len(prompts) == 1
+    assert prompts[0].count('Similar past requests and accepted outputs') == 1
+    assert 'Input:\nShip the talk outline\n' in prompts[0]
+    assert 'Definition of done:\nWrite a conference talk\n' in prompts[0]
@@ -0,0 +1,44 @@
+import pytest
+
+from backend.llm import breakdown, plan, refine
+from backend.schemas import PlanStep
+
+
+EXAMPLES = 'Similar past requests and accepted outputs. EXAMPLE-MARKER\n\n'
+
+
+@pytest.mark.parametrize('module, payload, goal', [
+    (
+        refine,
+        {'idea': 'Plan my path', 'context': None, 'examples_block': EXAMPLES},
+        'Idea:\nPlan my path\n'
+    ),
+    (
+        breakdown,
+        {'definition': 'Ship X', 'max_steps': 5, 'examples_block': EXAMPLES},
+        'Definition of done:\nShip X\n'
+    ),
+    (
+        plan,
+        {
+            'optionName': 'Lean Plan',
+            'steps': [PlanStep(text='Write the outline')],
+            'total_minutes': 60,
+            'examples_block': EXAMPLES
+        },
+        'Selected option: Lean Plan\n'
+    ),
+])
+def test_examples_block_renders_once(module, payload, goal):
+    rendered = (module.chain.first | module.prompt).invoke(payload).to_string()
+
+    assert rendered.count('EXAMPLE-MARKER') == 1
+    assert goal in rendered
+
+
+def test_no_examples_leaves_prompt_unchanged():
+    rendered = (breakdown.chain.first | breakdown.prompt).invoke(
+        {'definition': 'Ship X', 'max_steps': 5, 'examples_block': ''}
+    ).to_string()
+
+    assert 'Human: Definition of done:\nShip X\n' in rendered
@@ -0,0 +1,148 @@
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+
+from backend import recall
+from backend.recall import Recall, VectorIndex
+from backend.schemas import RefineResponse
+
+
+def _unit_rows(n: int, dim: int = 8, seed: int = 0) -> np.ndarray:
+    rows = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def _fill(index: VectorIndex, rows: np.ndarray, start: int = 0):
+    for i, row in enumerate(rows, start=start):
+        index.add(row, {'input': str(i), 'fields': None, 'output': {}})
+
+
+def test_reload_after_doubling_growth(tmp_path):
+    rows = _unit_rows(1500)
+    _fill(VectorIndex(tmp_path), rows)
+
+    assert os.path.getsize(tmp_path / 'vectors.f32') == 2048 * 8 * 4
+    reloaded = VectorIndex(tmp_path)
+    assert len(reloaded) == 1500
+    score, entry = reloaded.top_k(rows[1234], 1)[0]
+    assert entry['input'] == '1234'
+    assert score == pytest.approx(1.0)
+
+
+def test_torn_write_is_dropped_and_appends_stay_clean(tmp_path):
+    rows = _unit_rows(4)
+    _fill(VectorIndex(tmp_path), rows[:3])
+    with open(tmp_path / 'entries.jsonl', 'ab') as f:
+        f.write(b'{"input": "ha')
+
+    index = VectorIndex(tmp_path)
+    assert len(index) == 3
+    _fill(index, rows[3:], start=3)
+
+    reloaded = VectorIndex(tmp_path)
+    assert len(reloaded) == 4
+    assert reloaded.top_k(rows[3], 1)[0][1]['input'] == '3'
+
+
+def test_meta_without_vectors_starts_empty(tmp_path):
+    with open(tmp_path / 'meta.json', 'w') as f:
+        json.dump({'dim': 8}, f)
+
+    index = VectorIndex(tmp_path)
+    assert len(index) == 0
+    _fill(index, _unit_rows(2))
+    assert len(VectorIndex(tmp_path)) == 2
+
+
+def test_trained_lists_survive_reload_and_take_new_rows(tmp_path):
+    rows = _unit_rows(301)
+    index = VectorIndex(tmp_path, nlist=8, nprobe=8, train_size=10**9)
+    _fill(index, rows[:300])
+    index.train()
+    _fill(index, rows[300:], start=300)
+
+    # probing every list must agree with an exact scan
+    reloaded = VectorIndex(tmp_path, nlist=8, nprobe=8)
+    exact = np.argsort(rows @ rows[42])[::-1][:5]
+    assert [e['input'] for _, e in reloaded.top_k(rows[42], 5)] == \
+        [str(i) for i in exact]
+    assert reloaded.top_k(rows[300], 1)[0][1]['input'] == '300'
+
+
+@pytest.fixture
+def refine_recall(tmp_path, monkeypatch):
+    vectors = {
+        'plan my path': np.array([1, 0, 0], dtype=np.float32),
+        'plan my career path': np.array([0.99, 0.141, 0], dtype=np.float32),
+        'bake bread': np.array([0.6, 0, 0.8], dtype=np.float32),
+    }
+    monkeypatch.setattr(recall, 'ollama_client', object())
+    monkeypatch.setattr(recall, 'embed', lambda text: vectors[text])
+    monkeypatch.setattr(recall.settings, 'embed_model_name', 'test-embed')
+    monkeypatch.setattr(recall.settings, 'recall_dir', str(tmp_path))
+    monkeypatch.setattr(recall.settings, 'recall_threshold', 0.97)
+    return Recall('refine', RefineResponse)
+
+
+def _stored_response() -> RefineResponse:
+    return RefineResponse(
+        refinedIdea='Six month path toward AI platform roles', questions=[]
+    )
+
+
+def test_near_duplicate_with_equal_fields_is_a_hit(refine_recall):
+    refine_recall.lookup('plan my path', {'max_steps': 5}).remember(_stored_response())
+
+    recollection = refine_recall.lookup('plan my career path', {'max_steps': 5})
+    assert recollection.hit == _stored_response()
+
+
+def test_different_fields_fall_back_to_few_shot(refine_recall):
+    refine_recall.lookup('plan my path', {'max_steps': 5}).remember(_stored_response())
+
+    recollection = refine_recall.lookup('plan my career path', {'max_steps': 7})
+    assert recollection.hit is None
+    assert [n['input'] for n in recollection.neighbours] == ['plan my path']
+    assert '"max_steps": 5' in recollection.examples_block
+
+
+def test_below_threshold_gives_few_shot(refine_recall):
+    refine_recall.lookup('plan my path').remember(_stored_response())
+
+    recollection = refine_recall.lookup('bake bread')
+    assert recollection.hit is None
+    assert 'Six month path' in recollection.examples_block
+
+
+def _wait_for_training(index: VectorIndex):
+    deadline = time.monotonic() + 10
+    while index._training and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not index._training
+
+
+def test_lists_retrain_as_the_index_grows(tmp_path):
+    rows = _unit_rows(200)
+    index = VectorIndex(tmp_path, nlist=4, nprobe=4, train_size=50, retrain_factor=2)
+    _fill(index, rows[:50])
+    _wait_for_training(index)
+    assert sorted(p.name for p in tmp_path.glob('*-1.*')) == \
+        ['centroids-1.f32', 'lists-1.i32']
+
+    _fill(index, rows[50:99], start=50)
+    _wait_for_training(index)
+    assert not list(tmp_path.glob('*-2.*'))
+    _fill(index, rows[99:], start=99)
+    _wait_for_training(index)
+
+    with open(tmp_path / 'meta.json') as f:
+        meta = json.load(f)
+    assert meta['generation'] == 2 and meta['trained_rows'] >= 100
+    assert not list(tmp_path.glob('*-1.*'))
+
+    reloaded = VectorIndex(tmp_path, nlist=4, nprobe=4)
+    assert sum(len(members) for members in reloaded._lists) == 200
+    assert reloaded.top_k(rows[150], 1)[0][1]['input'] == '150'